@@ -4,28 +4,53 @@ Agent Setup Module
 Handles agent initialization and tool registration.
 """
 
-import os
+import functools
 from pathlib import Path
-from typing import Union
-from dotenv import load_dotenv
+import httpx
 from pydantic_ai import Agent
-from pydantic_ai.models.anthropic import AnthropicModel
+from pydantic_ai.models.anthropic import AnthropicModel, AnthropicModelSettings
 from pydantic_ai.providers.anthropic import AnthropicProvider
 from pydantic_ai.mcp import load_mcp_servers
-from langsmith import traceable
 
-# Load environment variables
-load_dotenv()
-
-ANTHROPIC_API_KEY = os.getenv("AC_ANTHROPIC_API_KEY")
+from src.config import settings
 
 
+@functools.lru_cache(maxsize=1)
 def _load_system_prompt() -> str:
-    """Load system prompt from file."""
+    """Load system prompt from file (cached after the first read).
+
+    The returned prompt is frozen for the lifetime of the process. Never
+    splice dynamic values (timestamps, per-user memory, etc.) into it:
+    a byte-identical system prefix is what lets Anthropic serve cached
+    prefill instead of re-billing the full prompt on every turn. Dynamic
+    context belongs in tools or the user message instead.
+    """
     prompt_path = Path(__file__).parent / "system_prompt.txt"
     return prompt_path.read_text().strip()
 
 
+@functools.cache
+def _get_model() -> AnthropicModel:
+    """Shared provider/model pair for every agent in this process.
+
+    The provider owns an httpx connection pool; reusing one instance keeps
+    TLS/HTTP2 connections to Anthropic warm across agent creations instead
+    of rebuilding the pool each time.
+    """
+    # Tool-call-heavy sessions fire many back-to-back Anthropic requests;
+    # HTTP/2 multiplexes them over one warm TLS connection, and the long
+    # keepalive_expiry stops the pool from re-handshaking between turns.
+    # The 600s read timeout matches the Anthropic SDK default so long
+    # generations aren't cut off.
+    http_client = httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(600.0, connect=5.0),
+        limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60.0),
+    )
+    provider = AnthropicProvider(api_key=settings.anthropic_api_key, http_client=http_client)
+    return AnthropicModel("claude-sonnet-4-5-20250929", provider=provider)
+
+
 def create_agent() -> Agent:
     """
     Create and configure the Pydantic AI agent.
@@ -33,8 +58,7 @@ def create_agent() -> Agent:
     Returns:
         Agent: Configured Pydantic AI agent
     """
-    provider = AnthropicProvider(api_key=ANTHROPIC_API_KEY)
-    model = AnthropicModel("claude-sonnet-4-5-20250929", provider=provider)
+    model = _get_model()
     system_prompt = _load_system_prompt()
 
     # Load MCP servers from configuration with graceful fallback
@@ -44,7 +68,13 @@ def create_agent() -> Agent:
         model=model,
         system_prompt=system_prompt,
         toolsets=mcp_servers,  # Add MCP server tools
-        retries=10
+        retries=5,  # Tool-call retry budget; each retry is a full model round-trip
+        # Mark the system prompt and tool schemas as cacheable so Anthropic
+        # reuses the prefill across turns (cached input bills at ~10%)
+        model_settings=AnthropicModelSettings(
+            anthropic_cache_instructions=True,
+            anthropic_cache_tool_definitions=True,
+        )
     )
 
     return agent
@@ -1,53 +1,138 @@
 """Gradio chat interface for Pydantic AI Agent with Gong and HubSpot Connectors"""
-    
-from dotenv import load_dotenv
-import gradio as gr
-from src.agent_setup import create_agent
 
-# Load environment variables
-load_dotenv()
+# Lazy annotations so chat()'s gr.Request hint doesn't need gradio at import
+from __future__ import annotations
+
+import asyncio
+
+from pydantic_ai.messages import ModelRequest, UserPromptPart
+
+from src.agent_setup import create_agent
+from src.config import settings
 
 # Global state (initialized on first message)
 agent = None
-message_history = []
 
+# Per-session transcripts keyed by Gradio session hash, so concurrent
+# users each get their own history instead of racing on a shared global.
+# Bounded: gradio mints a fresh session hash per page load, so without
+# eviction a long-running server keeps one transcript per page view
+# forever.
+_HISTORIES: dict[str, list] = {}
+MAX_SESSIONS = 256
+
+
+def _session_history(session_id: str) -> list:
+    """Return the session's transcript, evicting the stalest one over cap.
+
+    Pop + re-insert makes dict order track recency, so the first key is
+    always the least recently used session.
+    """
+    history = _HISTORIES.pop(session_id, None)
+    if history is None:
+        history = []
+        if len(_HISTORIES) >= MAX_SESSIONS:
+            _HISTORIES.pop(next(iter(_HISTORIES)))
+    _HISTORIES[session_id] = history
+    return history
+
+# Cap on retained history: every turn re-sends the full transcript to the
+# model, so unbounded growth makes long conversations quadratically
+# expensive in prefill tokens and latency.
+MAX_HISTORY_MESSAGES = 40
+
+
+def _trim_history(messages: list) -> None:
+    """Trim the transcript in place to roughly MAX_HISTORY_MESSAGES.
 
-async def chat(message, history):
+    The first message is always preserved (it carries the system prompt),
+    and the cut is only made at a user-turn boundary: slicing at an
+    arbitrary index routinely separates a tool_use response from its
+    tool_result request, which Anthropic rejects on every later run. A
+    deque(maxlen=...) would be simpler but would evict the first message
+    and cut mid-turn. The kept tail may slightly exceed the cap.
+    """
+    overflow = len(messages) - MAX_HISTORY_MESSAGES
+    if overflow <= 0:
+        return
+    for cut in range(overflow + 1, len(messages)):
+        msg = messages[cut]
+        if isinstance(msg, ModelRequest) and any(
+            isinstance(part, UserPromptPart) for part in msg.parts
+        ):
+            del messages[1:cut]
+            return
+    # No user-turn boundary past the cap: leave the transcript alone
+    # rather than tear a tool_use/tool_result pair apart
+
+
+async def chat(message, history, request: gr.Request):
     """Handle chat messages with the agent."""
-    global agent, message_history
+    global agent
 
     # Lazy initialization on first message
     if agent is None:
         # Create and configure the agent
         agent = create_agent()
 
+    session_id = request.session_hash
+    message_history = _session_history(session_id)
+
     try:
-        # Run agent with message history
-        result = await agent.run(message, message_history=message_history)
+        # Run agent with this session's message history, capped so a
+        # runaway tool loop can't hold a queue slot for minutes
+        async with asyncio.timeout(settings.agent_timeout_s):
+            result = await agent.run(message, message_history=message_history)
 
-        # Update message history with the full conversation
-        message_history = result.all_messages()
+        # Append only this turn's new messages and trim in place: the
+        # session keeps one bounded list instead of re-copying the whole
+        # transcript out of all_messages() every turn
+        message_history.extend(result.new_messages())
+        _trim_history(message_history)
 
         return result.output
 
+    except TimeoutError:
+        return f"Error: the agent did not finish within {settings.agent_timeout_s:.0f}s. Please try again."
     except Exception as e:
         return f"Error: {str(e)}"
 
 
-# Create Gradio chat interface
-demo = gr.ChatInterface(
-    chat,
-    title="AI Agent Chat",
-    description="Ask me about anything you are looking to learn more about.",
-    examples=[
-        "List 10 users in my Gong organization",
-        "Show me a call transcript from last week",
-        "List all contacts in HubSpot",
-        "Find companies with domain invesco.com"
-    ]
-)
+def main():
+    """Build the Gradio chat interface and launch the server."""
+    # Deferred import: gradio's import chain (fastapi, pandas, PIL, ...)
+    # dominates cold start, and only the entrypoint needs the UI
+    global gr
+    import gradio as gr
+
+    demo = gr.ChatInterface(
+        chat,
+        title="AI Agent Chat",
+        description="Ask me about anything you are looking to learn more about.",
+        examples=[
+            "List 10 users in my Gong organization",
+            "Show me a call transcript from last week",
+            "List all contacts in HubSpot",
+            "Find companies with domain invesco.com"
+        ]
+    )
 
-if __name__ == "__main__":
     print("Starting AI Agent Chat...")
     print("Server running on http://localhost:8000")
+
+    # Explicit queue limits: gradio's default concurrency of 1 would make
+    # every long LLM turn block all other sessions
+    demo.queue(max_size=64, default_concurrency_limit=16)
     demo.launch(server_port=8000, server_name="0.0.0.0")
+
+
+if __name__ == "__main__":
+    # uvloop speeds up socket and task scheduling for every await on the
+    # request path; fall back silently where it's unavailable (Windows)
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
+    main()
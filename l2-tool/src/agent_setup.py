@@ -4,14 +4,17 @@ Agent Setup Module
 Handles agent initialization and tool registration.
 """
 
+import functools
 import os
-import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from typing import Literal
-from dotenv import load_dotenv
+import httpx
+import orjson
 from pydantic_ai import Agent
-from pydantic_ai.models.anthropic import AnthropicModel
+from pydantic_ai.models.anthropic import AnthropicModel, AnthropicModelSettings
 from pydantic_ai.providers.anthropic import AnthropicProvider
 from pydantic_ai.messages import FunctionToolCallEvent
 from langsmith import traceable
@@ -19,20 +22,54 @@ from airbyte_agent_gong import GongConnector
 from airbyte_agent_hubspot import HubspotConnector
 from airbyte_agent_linear import LinearConnector
 
-# Load environment variables
-load_dotenv()
+from src.config import settings
 
-# Airbyte configuration constants
-AIRBYTE_CLIENT_ID = os.getenv("AC_AIRBYTE_CLIENT_ID")
-AIRBYTE_CLIENT_SECRET = os.getenv("AC_AIRBYTE_CLIENT_SECRET")
-EXTERNAL_USER_ID = os.getenv("AC_EXTERNAL_USER_ID", "customer-workspace")
-ANTHROPIC_API_KEY = os.getenv("AC_ANTHROPIC_API_KEY")
+# Keep LangSmith off the request hot path: flush trace exports from a
+# background thread, and replace @traceable with a no-op when tracing is
+# not enabled so tool calls skip the decorator overhead entirely.
+os.environ.setdefault("LANGCHAIN_CALLBACKS_BACKGROUND", "true")
 
+if not os.getenv("LANGSMITH_TRACING"):
+    def traceable(*args, **kwargs):  # noqa: F811 - intentional no-op override
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+@functools.lru_cache(maxsize=1)
 def _load_system_prompt() -> str:
-    """Load system prompt from file."""
+    """Load system prompt from file (cached after the first read).
+
+    The returned prompt is frozen for the lifetime of the process. Never
+    splice dynamic values (timestamps, per-user memory, etc.) into it:
+    a byte-identical system prefix is what lets Anthropic serve cached
+    prefill instead of re-billing the full prompt on every turn. Dynamic
+    context belongs in tools or the user message instead.
+    """
     prompt_path = Path(__file__).parent / "system_prompt.txt"
     return prompt_path.read_text().strip()
 
+@functools.cache
+def _get_model() -> AnthropicModel:
+    """Shared provider/model pair for every agent in this process.
+
+    The provider owns an httpx connection pool; reusing one instance keeps
+    TLS/HTTP2 connections to Anthropic warm across agent creations instead
+    of rebuilding the pool each time.
+    """
+    # Tool-call-heavy sessions fire many back-to-back Anthropic requests;
+    # HTTP/2 multiplexes them over one warm TLS connection, and the long
+    # keepalive_expiry stops the pool from re-handshaking between turns.
+    # The 600s read timeout matches the Anthropic SDK default so long
+    # generations aren't cut off.
+    http_client = httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(600.0, connect=5.0),
+        limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60.0),
+    )
+    provider = AnthropicProvider(api_key=settings.anthropic_api_key, http_client=http_client)
+    return AnthropicModel("claude-sonnet-4-5-20250929", provider=provider)
+
+
 def create_agent() -> Agent:
     """
     Create and configure the Pydantic AI agent.
@@ -40,24 +77,78 @@ def create_agent() -> Agent:
     Returns:
         Agent: Configured Pydantic AI agent
     """
-    provider = AnthropicProvider(api_key=ANTHROPIC_API_KEY)
-    model = AnthropicModel("claude-sonnet-4-5-20250929", provider=provider)
+    model = _get_model()
     system_prompt = _load_system_prompt()
 
     agent = Agent(
         model=model,
         # deps_type=Union[GongConnector, HubspotConnector],
         system_prompt=system_prompt,
-        retries=10,  # Allow up to 10 tool call iterations before stopping
+        retries=5,  # Tool-call retry budget; each retry is a full model round-trip
         event_stream_handler=log_tool_calls,  # Log tool calls to terminal
+        # Mark the system prompt and tool schemas as cacheable so Anthropic
+        # reuses the prefill across turns (cached input bills at ~10%)
+        model_settings=AnthropicModelSettings(
+            anthropic_cache_instructions=True,
+            anthropic_cache_tool_definitions=True,
+        ),
     )
 
     return agent
 
+# ============== Connector singletons ==============
+# Each connector performs its credential bootstrap when constructed, so the
+# cached factories make sure that happens once per process instead of once
+# per register_*_tools call.
+
+@functools.cache
+def _get_gong() -> GongConnector:
+    return GongConnector(
+        external_user_id=settings.external_user_id or "customer-workspace",
+        airbyte_client_id=settings.airbyte_client_id,
+        airbyte_client_secret=settings.airbyte_client_secret
+    )
+
+@functools.cache
+def _get_hubspot() -> HubspotConnector:
+    return HubspotConnector(
+        external_user_id=settings.external_user_id or "customer-workspace",
+        airbyte_client_id=settings.airbyte_client_id,
+        airbyte_client_secret=settings.airbyte_client_secret
+    )
+
+@functools.cache
+def _get_linear() -> LinearConnector:
+    return LinearConnector(
+        external_user_id=settings.external_user_id or "customer-workspace",
+        airbyte_client_id=settings.airbyte_client_id,
+        airbyte_client_secret=settings.airbyte_client_secret
+    )
+
+def warm_connectors() -> None:
+    """Prime the cached connector factories in parallel.
+
+    Each connector's credential bootstrap is independent network I/O, so
+    warming all three concurrently costs max(RTT) instead of sum(RTT).
+    Subsequent register_*_tools calls then hit the warm cache.
+    """
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [
+            pool.submit(_get_gong),
+            pool.submit(_get_hubspot),
+            pool.submit(_get_linear),
+        ]
+        for future in futures:
+            future.result()
+
 def register_generic_tools(agent: Agent):
-    def get_current_date() -> str:
+    # async so pydantic-ai runs it inline on the event loop instead of
+    # dispatching a one-liner to the thread pool
+    async def get_current_date() -> str:
         """
-        Get the current date and time.
+        Get the current date and time. Fallback only: today's date is
+        already stated at the start of the conversation, so call this
+        just when the exact current time matters.
 
         Returns:
             str: Current date and time in ISO format
@@ -66,18 +157,17 @@ def register_generic_tools(agent: Agent):
     
 ########### Add Gong Connector
 
-def register_gong_tools(agent: Agent):
-    # Initialize connector
-    connector = GongConnector(
-        external_user_id=EXTERNAL_USER_ID,
-        airbyte_client_id=AIRBYTE_CLIENT_ID,
-        airbyte_client_secret=AIRBYTE_CLIENT_SECRET
-    )
+# The *_execute tools are defined (and decorated) at module scope:
+# Connector.tool_utils walks the connector's entity/action catalog to build
+# the tool schema, so running it here means that introspection happens once
+# per process, however many times the register_* helpers are called.
 
-    @agent.tool_plain
-    @GongConnector.tool_utils
-    async def gong_execute(entity: str, action: Literal["list", "get"], params: dict | None = None):
-        return await connector.execute(entity, action, params or {})
+@GongConnector.tool_utils
+async def gong_execute(entity: str, action: Literal["list", "get"], params: dict | None = None):
+    return await _get_gong().execute(entity, action, params or {})
+
+def register_gong_tools(agent: Agent):
+    agent.tool_plain(gong_execute)
 
     # @agent.tool_plain
     # async def gong_execute(entity: str, action: str, params: dict | None = None):
@@ -135,62 +225,83 @@ def register_gong_tools(agent: Agent):
 
 ########### Add Linear Connector
 
-def register_linear_tools(agent: Agent):
-    connector = LinearConnector(
-        external_user_id=EXTERNAL_USER_ID,
-        airbyte_client_id=AIRBYTE_CLIENT_ID,
-        airbyte_client_secret=AIRBYTE_CLIENT_SECRET
-    )
+@LinearConnector.tool_utils
+@traceable(name="linear_execute")
+async def linear_execute(entity: str, action: str, params: dict | None = None):
+    return await _get_linear().execute(entity, action, params or {})
 
-    @agent.tool_plain
-    @LinearConnector.tool_utils
-    @traceable(name="linear_execute")
-    async def linear_execute(entity: str, action: str, params: dict | None = None):
-        return await connector.execute(entity, action, params or {})
+def register_linear_tools(agent: Agent):
+    agent.tool_plain(linear_execute)
 
 
 ########### Add Hubspot Connector
 
-def register_hubspot_tools(agent: Agent):
-    # Initialize connector
-    connector = HubspotConnector(
-        external_user_id=EXTERNAL_USER_ID,
-        airbyte_client_id=AIRBYTE_CLIENT_ID,
-        airbyte_client_secret=AIRBYTE_CLIENT_SECRET
-    )
+@HubspotConnector.tool_utils
+@traceable(name="hubspot_execute")
+async def hubspot_execute(entity: str, action: str, params: dict | None = None):
+    return await _get_hubspot().execute(entity, action, params or {})
 
-    @agent.tool_plain
-    @HubspotConnector.tool_utils
-    @traceable(name="hubspot_execute")
-    async def hubspot_execute(entity: str, action: str, params: dict | None = None):
-        return await connector.execute(entity, action, params or {})
+def register_hubspot_tools(agent: Agent):
+    agent.tool_plain(hubspot_execute)
 
 ############### 
 
+# ANSI color codes and banner fragments for log_tool_calls. These are
+# loop-invariant, so they are built once at import time rather than on
+# every tool-call event.
+_CYAN = "\033[96m"
+_MAGENTA = "\033[95m"
+_YELLOW = "\033[93m"
+_GREEN = "\033[92m"
+_RESET = "\033[0m"
+_BOLD = "\033[1m"
+_SEP_EQ = f"{_CYAN}{'=' * 50}{_RESET}"
+_SEP_DASH = f"{_CYAN}{'-' * 50}{_RESET}"
+_BANNER_HEAD = (
+    f"\n{_SEP_EQ}\n"
+    f"{_BOLD}{_MAGENTA}🔧 [TOOL CALL]{_RESET} {_BOLD}{_GREEN}{{tool}}{_RESET}\n"
+    f"{_SEP_DASH}\n"
+    f"{_YELLOW}Parameters:{_RESET}\n"
+)
+_BANNER_TAIL = f"\n{_SEP_EQ}\n\n"
+
+
 async def log_tool_calls(ctx, events):
     """
     Event stream handler that logs tool calls to the terminal.
 
     Displays tool name and parameters in an easy-to-read format with colors.
     """
-    # ANSI color codes
-    CYAN = "\033[96m"
-    MAGENTA = "\033[95m"
-    YELLOW = "\033[93m"
-    GREEN = "\033[92m"
-    RESET = "\033[0m"
-    BOLD = "\033[1m"
+    # Only format when someone is watching; non-interactive runs (server
+    # logs, CI) and LOG_TOOL_CALLS=0 skip the work entirely. Events must
+    # still be drained.
+    interactive = sys.stdout.isatty() and os.getenv("LOG_TOOL_CALLS", "1") != "0"
 
     async for event in events:
-        if isinstance(event, FunctionToolCallEvent):
-            # Extract tool name and args
+        if interactive and isinstance(event, FunctionToolCallEvent):
             tool_name = event.part.tool_name
-            args = event.part.args_as_dict() if event.part.args else {}
-
-            # Pretty print to terminal with colors
-            print(f"\n{CYAN}{'='*50}{RESET}")
-            print(f"{BOLD}{MAGENTA}🔧 [TOOL CALL]{RESET} {BOLD}{GREEN}{tool_name}{RESET}")
-            print(f"{CYAN}{'-'*50}{RESET}")
-            print(f"{YELLOW}Parameters:{RESET}")
-            print(json.dumps(args, indent=2))
-            print(f"{CYAN}{'='*50}{RESET}\n")
+
+            # Model args usually arrive as a JSON string; re-indenting it
+            # directly with orjson is one parse + one serialize in C,
+            # instead of args_as_dict() followed by a second dump.
+            raw_args = event.part.args
+            if isinstance(raw_args, str):
+                try:
+                    args_json = orjson.dumps(
+                        orjson.loads(raw_args), option=orjson.OPT_INDENT_2
+                    ).decode()
+                except orjson.JSONDecodeError:
+                    args_json = raw_args  # show malformed payloads as-is
+            else:
+                args_json = orjson.dumps(
+                    raw_args or {}, option=orjson.OPT_INDENT_2
+                ).decode()
+
+            # Pretty print to terminal with colors, batched into a single
+            # write so each event costs one syscall instead of six
+            sys.stdout.write("".join((
+                _BANNER_HEAD.format(tool=tool_name),
+                args_json,
+                _BANNER_TAIL,
+            )))
+            sys.stdout.flush()
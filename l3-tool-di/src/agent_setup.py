@@ -4,29 +4,25 @@ Agent Setup Module
 Handles agent initialization and tool registration with dependency injection.
 """
 
+import asyncio
+import functools
 import os
-import json
+import sys
 from dataclasses import dataclass
 from pathlib import Path
 from datetime import datetime
-from dotenv import load_dotenv
+from typing import Literal
+import httpx
+import orjson
 from pydantic_ai import Agent, RunContext
-from pydantic_ai.models.anthropic import AnthropicModel
+from pydantic_ai.models.anthropic import AnthropicModel, AnthropicModelSettings
 from pydantic_ai.providers.anthropic import AnthropicProvider
 from pydantic_ai.messages import FunctionToolCallEvent
-from langsmith import traceable
 from airbyte_agent_gong import GongConnector
 from airbyte_agent_hubspot import HubspotConnector
 from airbyte_agent_linear import LinearConnector
 
-# Load environment variables
-load_dotenv()
-
-# Airbyte configuration constants
-AIRBYTE_CLIENT_ID = os.getenv("AC_AIRBYTE_CLIENT_ID")
-AIRBYTE_CLIENT_SECRET = os.getenv("AC_AIRBYTE_CLIENT_SECRET")
-EXTERNAL_USER_ID = os.getenv("AC_EXTERNAL_USER_ID", "customer-workspace")
-ANTHROPIC_API_KEY = os.getenv("AC_ANTHROPIC_API_KEY")
+from src.config import settings
 
 
 # ============== Dependencies ==============
@@ -38,43 +34,80 @@ class AgentDeps:
     linear: LinearConnector | None = None
 
 
-def create_deps(
+async def create_deps(
     include_gong: bool = True,
     include_hubspot: bool = True,
     include_linear: bool = True) -> AgentDeps:
-    
-    gong = None
-    hubspot = None
-    linear = None
-
-    if include_gong and AIRBYTE_CLIENT_ID and AIRBYTE_CLIENT_SECRET:
-        gong = GongConnector(
-            external_user_id=EXTERNAL_USER_ID,
-            airbyte_client_id=AIRBYTE_CLIENT_ID,
-            airbyte_client_secret=AIRBYTE_CLIENT_SECRET
-        )
+    """Construct the connector dependencies concurrently.
 
-    if include_hubspot and AIRBYTE_CLIENT_ID and AIRBYTE_CLIENT_SECRET:
-        hubspot = HubspotConnector(
-            external_user_id=EXTERNAL_USER_ID,
-            airbyte_client_id=AIRBYTE_CLIENT_ID,
-            airbyte_client_secret=AIRBYTE_CLIENT_SECRET
+    Each connector's constructor runs its own credential bootstrap against
+    Airbyte, so the three builds are dispatched to worker threads and
+    overlap: total latency is max(RTT) instead of sum(RTT). A connector
+    that fails to initialize is left as None so one broken provider
+    doesn't take down the others.
+    """
+    have_credentials = bool(settings.airbyte_client_id and settings.airbyte_client_secret)
+
+    async def _build(include: bool, connector_cls):
+        if not (include and have_credentials):
+            return None
+        return await asyncio.to_thread(
+            connector_cls,
+            external_user_id=settings.external_user_id or "customer-workspace",
+            airbyte_client_id=settings.airbyte_client_id,
+            airbyte_client_secret=settings.airbyte_client_secret
         )
 
-    if include_linear and AIRBYTE_CLIENT_ID and AIRBYTE_CLIENT_SECRET:
-        linear = LinearConnector(
-            external_user_id=EXTERNAL_USER_ID,
-            airbyte_client_id=AIRBYTE_CLIENT_ID,
-            airbyte_client_secret=AIRBYTE_CLIENT_SECRET
-        )
+    gong, hubspot, linear = await asyncio.gather(
+        _build(include_gong, GongConnector),
+        _build(include_hubspot, HubspotConnector),
+        _build(include_linear, LinearConnector),
+        return_exceptions=True,
+    )
+
+    def _or_none(result):
+        if isinstance(result, BaseException):
+            print(f"Warning: connector initialization failed: {result}")
+            return None
+        return result
 
-    return AgentDeps(gong=gong, hubspot=hubspot, linear=linear)
+    return AgentDeps(gong=_or_none(gong), hubspot=_or_none(hubspot), linear=_or_none(linear))
 
+@functools.lru_cache(maxsize=1)
 def _load_system_prompt() -> str:
-    """Load system prompt from file."""
+    """Load system prompt from file (cached after the first read).
+
+    The returned prompt is frozen for the lifetime of the process. Never
+    splice dynamic values (timestamps, per-user memory, etc.) into it:
+    a byte-identical system prefix is what lets Anthropic serve cached
+    prefill instead of re-billing the full prompt on every turn. Dynamic
+    context belongs in tools or the user message instead.
+    """
     prompt_path = Path(__file__).parent / "system_prompt.txt"
     return prompt_path.read_text().strip()
 
+@functools.cache
+def _get_model() -> AnthropicModel:
+    """Shared provider/model pair for every agent in this process.
+
+    The provider owns an httpx connection pool; reusing one instance keeps
+    TLS/HTTP2 connections to Anthropic warm across agent creations instead
+    of rebuilding the pool each time.
+    """
+    # Tool-call-heavy sessions fire many back-to-back Anthropic requests;
+    # HTTP/2 multiplexes them over one warm TLS connection, and the long
+    # keepalive_expiry stops the pool from re-handshaking between turns.
+    # The 600s read timeout matches the Anthropic SDK default so long
+    # generations aren't cut off.
+    http_client = httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(600.0, connect=5.0),
+        limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60.0),
+    )
+    provider = AnthropicProvider(api_key=settings.anthropic_api_key, http_client=http_client)
+    return AnthropicModel("claude-sonnet-4-5-20250929", provider=provider)
+
+
 def create_agent() -> Agent[AgentDeps, str]:
     """
     Create and configure the Pydantic AI agent with dependency injection.
@@ -82,18 +115,28 @@ def create_agent() -> Agent[AgentDeps, str]:
     Returns:
         Agent[AgentDeps, str]: Configured Pydantic AI agent with dependency type specified
     """
-    provider = AnthropicProvider(api_key=ANTHROPIC_API_KEY)
-    model = AnthropicModel("claude-sonnet-4-5-20250929", provider=provider)
+    model = _get_model()
     system_prompt = _load_system_prompt()
 
     agent = Agent(
         model=model,
         deps_type=AgentDeps,
         system_prompt=system_prompt,
-        retries=10,  # Allow up to 10 tool call iterations before stopping
-        event_stream_handler=log_tool_calls  # Log tool calls to terminal
+        retries=5,  # Tool-call retry budget; each retry is a full model round-trip
+        event_stream_handler=log_tool_calls,  # Log tool calls to terminal
+        # Mark the system prompt and tool schemas as cacheable so Anthropic
+        # reuses the prefill across turns (cached input bills at ~10%)
+        model_settings=AnthropicModelSettings(
+            anthropic_cache_instructions=True,
+            anthropic_cache_tool_definitions=True,
+        )
     )
 
+    # Tools are registered here, as part of the one-time agent build, so
+    # callers can't accidentally re-register (and re-introspect) them on
+    # the request path.
+    register_tools(agent)
+
     return agent
 
 def register_tools(agent: Agent[AgentDeps, str]) -> None:
@@ -101,63 +144,82 @@ def register_tools(agent: Agent[AgentDeps, str]) -> None:
 
     # ============== Generic Tools ==============
 
+    # async so pydantic-ai runs it inline on the event loop instead of
+    # dispatching a one-liner to the thread pool
     @agent.tool_plain
-    def get_current_date() -> str:
+    async def get_current_date() -> str:
         """
-        Get the current date and time.
+        Get the current date and time. Fallback only: today's date is
+        already stated at the start of the conversation, so call this
+        just when the exact current time matters.
 
         Returns:
             str: Current date and time in ISO format
         """
         return datetime.now().isoformat()
 
-    # ============== Gong Tools ==============
-
-    @agent.tool
-    @GongConnector.tool_utils
-    async def gong_execute(
-        ctx: RunContext[AgentDeps],
-        entity: str,
-        action: str,
-        params: dict | None = None
-    ):
-        """Execute Gong API operations."""
-        if ctx.deps.gong is None:
-            return {"error": "Gong connector is not configured. Please set up the Gong integration."}
-        return await ctx.deps.gong.execute(entity, action, params or {})
+    # ============== Connector Tools ==============
 
-    # ============== Linear Tools ==============
+    # One dispatch tool instead of three near-identical *_execute wrappers:
+    # a single schema means fewer tool-definition tokens sent to the model
+    # on every request, and one closure instead of three decorator stacks.
+    CONNECTORS = {
+        "gong": lambda deps: deps.gong,
+        "linear": lambda deps: deps.linear,
+        "hubspot": lambda deps: deps.hubspot,
+    }
 
     @agent.tool
-    @LinearConnector.tool_utils
-    async def linear_execute(
+    async def connector_execute(
         ctx: RunContext[AgentDeps],
+        connector: Literal["gong", "linear", "hubspot"],
         entity: str,
         action: str,
         params: dict | None = None
     ):
-        """Execute Linear API operations."""
-        if ctx.deps.linear is None:
-            return {"error": "Linear connector is not configured. Please set up the Linear integration."}
-        return await ctx.deps.linear.execute(entity, action, params or {})
+        """Execute an operation against one of the connected services.
+
+        Args:
+            connector: Which service to call — "gong" (call recordings,
+                transcripts, users, stats), "linear" (issues, projects,
+                teams, comments) or "hubspot" (contacts, companies, deals,
+                tickets).
+            entity: Entity name within the connector, e.g. "calls",
+                "users", "issues", "contacts", "companies".
+            action: Operation to perform: "list", "get", "search",
+                "create" or "update" depending on the entity.
+            params: Operation parameters (e.g. {"id": ...} for get,
+                filters/cursor for list). list responses look like
+                {data: [...], meta: {has_more: bool}}; pass the cursor
+                from the previous page while has_more is true.
+        """
+        conn = CONNECTORS[connector](ctx.deps)
+        if conn is None:
+            return {"error": f"{connector} connector is not configured. Please set up the {connector} integration."}
+        return await conn.execute(entity, action, params or {})
 
-    # ============== HubSpot Tools ==============
 
-    @agent.tool
-    @HubspotConnector.tool_utils
-    async def hubspot_execute(
-        ctx: RunContext[AgentDeps],
-        entity: str,
-        action: str,
-        params: dict | None = None
-    ):
-        """Execute HubSpot API operations."""
-        if ctx.deps.hubspot is None:
-            return {"error": "HubSpot connector is not configured. Please set up the HubSpot integration."}
-        return await ctx.deps.hubspot.execute(entity, action, params or {})
+############### 
 
+# ANSI color codes and banner fragments for log_tool_calls. These are
+# loop-invariant, so they are built once at import time rather than on
+# every tool-call event.
+_CYAN = "\033[96m"
+_MAGENTA = "\033[95m"
+_YELLOW = "\033[93m"
+_GREEN = "\033[92m"
+_RESET = "\033[0m"
+_BOLD = "\033[1m"
+_SEP_EQ = f"{_CYAN}{'=' * 50}{_RESET}"
+_SEP_DASH = f"{_CYAN}{'-' * 50}{_RESET}"
+_BANNER_HEAD = (
+    f"\n{_SEP_EQ}\n"
+    f"{_BOLD}{_MAGENTA}🔧 [TOOL CALL]{_RESET} {_BOLD}{_GREEN}{{tool}}{_RESET}\n"
+    f"{_SEP_DASH}\n"
+    f"{_YELLOW}Parameters:{_RESET}\n"
+)
+_BANNER_TAIL = f"\n{_SEP_EQ}\n\n"
 
-############### 
 
 async def log_tool_calls(ctx, events):
     """
@@ -165,24 +227,36 @@ async def log_tool_calls(ctx, events):
 
     Displays tool name and parameters in an easy-to-read format with colors.
     """
-    # ANSI color codes
-    CYAN = "\033[96m"
-    MAGENTA = "\033[95m"
-    YELLOW = "\033[93m"
-    GREEN = "\033[92m"
-    RESET = "\033[0m"
-    BOLD = "\033[1m"
+    # Only format when someone is watching; non-interactive runs (server
+    # logs, CI) and LOG_TOOL_CALLS=0 skip the work entirely. Events must
+    # still be drained.
+    interactive = sys.stdout.isatty() and os.getenv("LOG_TOOL_CALLS", "1") != "0"
 
     async for event in events:
-        if isinstance(event, FunctionToolCallEvent):
-            # Extract tool name and args
+        if interactive and isinstance(event, FunctionToolCallEvent):
             tool_name = event.part.tool_name
-            args = event.part.args_as_dict() if event.part.args else {}
-
-            # Pretty print to terminal with colors
-            print(f"\n{CYAN}{'='*50}{RESET}")
-            print(f"{BOLD}{MAGENTA}🔧 [TOOL CALL]{RESET} {BOLD}{GREEN}{tool_name}{RESET}")
-            print(f"{CYAN}{'-'*50}{RESET}")
-            print(f"{YELLOW}Parameters:{RESET}")
-            print(json.dumps(args, indent=2))
-            print(f"{CYAN}{'='*50}{RESET}\n")
+
+            # Model args usually arrive as a JSON string; re-indenting it
+            # directly with orjson is one parse + one serialize in C,
+            # instead of args_as_dict() followed by a second dump.
+            raw_args = event.part.args
+            if isinstance(raw_args, str):
+                try:
+                    args_json = orjson.dumps(
+                        orjson.loads(raw_args), option=orjson.OPT_INDENT_2
+                    ).decode()
+                except orjson.JSONDecodeError:
+                    args_json = raw_args  # show malformed payloads as-is
+            else:
+                args_json = orjson.dumps(
+                    raw_args or {}, option=orjson.OPT_INDENT_2
+                ).decode()
+
+            # Pretty print to terminal with colors, batched into a single
+            # write so each event costs one syscall instead of six
+            sys.stdout.write("".join((
+                _BANNER_HEAD.format(tool=tool_name),
+                args_json,
+                _BANNER_TAIL,
+            )))
+            sys.stdout.flush()
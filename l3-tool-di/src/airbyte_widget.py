@@ -4,13 +4,83 @@ This module handles token management for the Airbyte Embedded Widget,
 including fetching application tokens and widget tokens from the Airbyte API.
 """
 
-import os
+import asyncio
+import atexit
+import base64
+import time
 import httpx
+import orjson
 from typing import Optional
 
+from src.config import settings
+
 
 AIRBYTE_API_BASE = "https://api.airbyte.ai/api/v1"
 
+# Shared connection pool so token calls reuse warm TLS connections instead
+# of paying a handshake per request. Bounded max_connections also prevents
+# ephemeral-port exhaustion under a burst of widget-token refreshes, and
+# HTTP/2 multiplexes concurrent requests over a single connection.
+_CLIENT = httpx.AsyncClient(
+    base_url=AIRBYTE_API_BASE,
+    http2=True,
+    timeout=httpx.Timeout(10.0, connect=3.0),
+    limits=httpx.Limits(
+        max_keepalive_connections=32,
+        max_connections=64,
+        keepalive_expiry=60.0
+    )
+)
+
+
+async def close_client() -> None:
+    """Close the shared HTTP client (call on app shutdown)."""
+    await _CLIENT.aclose()
+
+
+@atexit.register
+def _close_client_at_exit() -> None:
+    """Best-effort pool cleanup for hosts that never call close_client()."""
+    try:
+        asyncio.run(_CLIENT.aclose())
+    except Exception:
+        pass  # interpreter is shutting down; nothing left to leak to
+
+
+# Tokens are JWTs with multi-minute lifetimes, so cache them until shortly
+# before expiry instead of paying two HTTPS round-trips on every call
+_TOKEN_TTL_MARGIN = 30.0  # refresh this many seconds before the exp claim
+_token_cache: dict[tuple, tuple[str, float]] = {}
+
+
+def _jwt_expiry(token: str) -> Optional[float]:
+    """Extract the exp claim (unix seconds) from a JWT, or None if unreadable."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)  # restore base64 padding
+        claims = orjson.loads(base64.urlsafe_b64decode(payload))
+        return float(claims["exp"])
+    except (IndexError, KeyError, ValueError, TypeError):
+        return None
+
+
+def _cached_token(key: tuple) -> Optional[str]:
+    """Return a cached token if it is still comfortably within its lifetime."""
+    cached = _token_cache.get(key)
+    if cached is not None:
+        token, expires_at = cached
+        if time.time() < expires_at - _TOKEN_TTL_MARGIN:
+            return token
+        del _token_cache[key]
+    return None
+
+
+def _store_token(key: tuple, token: str) -> None:
+    """Cache a token until its exp claim (skip caching if exp is unreadable)."""
+    expires_at = _jwt_expiry(token)
+    if expires_at is not None:
+        _token_cache[key] = (token, expires_at)
+
 
 class AirbyteWidgetError(Exception):
     """Base exception for Airbyte widget errors."""
@@ -37,26 +107,29 @@ async def fetch_application_token() -> str:
         AirbyteAuthError: If authentication fails
         AirbyteConnectionError: If connection fails
     """
-    client_id = os.getenv("AC_AIRBYTE_CLIENT_ID")
-    client_secret = os.getenv("AC_AIRBYTE_CLIENT_SECRET")
+    client_id = settings.airbyte_client_id
+    client_secret = settings.airbyte_client_secret
 
     if not client_id or not client_secret:
         raise AirbyteAuthError("Missing AC_AIRBYTE_CLIENT_ID or AC_AIRBYTE_CLIENT_SECRET environment variables")
 
+    cache_key = ("application", client_id)
+    cached = _cached_token(cache_key)
+    if cached is not None:
+        return cached
+
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{AIRBYTE_API_BASE}/account/applications/token",
-                json={"client_id": client_id, "client_secret": client_secret},
-                timeout=10.0
-            )
-            response.raise_for_status()
-            data = response.json()
-            if "token" in data:
-                return data["token"]
-            if "access_token" in data:
-                return data["access_token"]
+        response = await _CLIENT.post(
+            "/account/applications/token",
+            json={"client_id": client_id, "client_secret": client_secret}
+        )
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        token = data.get("token") or data.get("access_token")
+        if token is None:
             raise AirbyteAuthError(f"Unexpected API response format: {list(data.keys())}")
+        _store_token(cache_key, token)
+        return token
     except httpx.HTTPStatusError as e:
         raise AirbyteAuthError(f"Authentication failed: {e.response.status_code}")
     except httpx.TimeoutException:
@@ -78,29 +151,32 @@ async def fetch_widget_token(app_token: str) -> str:
         AirbyteAuthError: If authentication fails
         AirbyteConnectionError: If connection fails
     """
-    external_user_id = os.getenv("AC_EXTERNAL_USER_ID")
+    external_user_id = settings.external_user_id
 
     if not external_user_id:
         raise AirbyteAuthError("Missing AC_EXTERNAL_USER_ID environment variable")
 
+    cache_key = ("widget", external_user_id)
+    cached = _cached_token(cache_key)
+    if cached is not None:
+        return cached
+
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{AIRBYTE_API_BASE}/embedded/widget-token",
-                headers={"Authorization": f"Bearer {app_token}"},
-                json={
-                    "workspace_name": external_user_id,
-                    "allowed_origin": "http://localhost:8000"
-                },
-                timeout=10.0
-            )
-            response.raise_for_status()
-            data = response.json()
-            if "token" in data:
-                return data["token"]
-            if "access_token" in data:
-                return data["access_token"]
+        response = await _CLIENT.post(
+            "/embedded/widget-token",
+            headers={"Authorization": f"Bearer {app_token}"},
+            json={
+                "workspace_name": external_user_id,
+                "allowed_origin": "http://localhost:8000"
+            }
+        )
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        token = data.get("token") or data.get("access_token")
+        if token is None:
             raise AirbyteAuthError(f"Unexpected widget token response format: {list(data.keys())}")
+        _store_token(cache_key, token)
+        return token
     except httpx.HTTPStatusError as e:
         raise AirbyteAuthError(f"Failed to fetch widget token: {e.response.status_code}")
     except httpx.TimeoutException:
@@ -112,7 +188,11 @@ async def fetch_widget_token(app_token: str) -> str:
 async def get_widget_token() -> str:
     """Get widget token by fetching both application and widget tokens.
 
-    This is a convenience function that combines both API calls.
+    This is a convenience function that combines both API calls. On the
+    warm path both tokens come straight from the TTL cache, and any cache
+    misses are served over the shared HTTP/2 pool with responses decoded
+    directly from the received bytes — no per-call client setup or extra
+    body copies.
 
     Returns:
         str: Widget token ready to use with AirbyteEmbeddedWidget
@@ -1,42 +1,128 @@
 """Gradio chat interface for Pydantic AI Agent with Gong and HubSpot Connectors"""
 
-from dotenv import load_dotenv
-import gradio as gr
+# Lazy annotations so chat()'s gr.Request hint doesn't need gradio at import
+from __future__ import annotations
 
-from src.agent_setup import create_agent, create_deps, register_tools
-from src.airbyte_widget import get_widget_token, generate_widget_html, AirbyteWidgetError
-
-# Load environment variables
-load_dotenv()
+import asyncio
+import contextlib
+from datetime import date
 
-# Global state (initialized on first message)
-agent = None
-deps = None
-message_history = []
+from pydantic_ai.messages import ModelRequest, UserPromptPart
 
+from src.config import settings
+from src.agent_setup import create_agent, create_deps
+from src.airbyte_widget import get_widget_token, generate_widget_html, AirbyteWidgetError
 
-async def chat(message, history):
+# Agent (with its tools) and dependencies are initialized eagerly at
+# import time, so the first user message doesn't pay the full setup cost
+# and chat() carries no init branch on the per-message path. create_deps
+# bootstraps the three connectors concurrently.
+agent = create_agent()
+deps = asyncio.run(create_deps())
+
+# Per-session transcripts keyed by Gradio session hash, so concurrent
+# users each get their own history instead of racing on a shared global.
+# Bounded: gradio mints a fresh session hash per page load, so without
+# eviction a long-running server keeps one transcript per page view
+# forever.
+_HISTORIES: dict[str, list] = {}
+MAX_SESSIONS = 256
+
+
+def _session_history(session_id: str) -> list:
+    """Return the session's transcript, evicting the stalest one over cap.
+
+    Pop + re-insert makes dict order track recency, so the first key is
+    always the least recently used session.
+    """
+    history = _HISTORIES.pop(session_id, None)
+    if history is None:
+        history = []
+        if len(_HISTORIES) >= MAX_SESSIONS:
+            _HISTORIES.pop(next(iter(_HISTORIES)))
+    _HISTORIES[session_id] = history
+    return history
+
+# Cap on retained history: every turn re-sends the full transcript to the
+# model, so unbounded growth makes long conversations quadratically
+# expensive in prefill tokens and latency.
+MAX_HISTORY_MESSAGES = 40
+
+
+def _trim_history(messages: list) -> None:
+    """Trim the transcript in place to roughly MAX_HISTORY_MESSAGES.
+
+    The first message is always preserved (it carries the system prompt),
+    and the cut is only made at a user-turn boundary: slicing at an
+    arbitrary index routinely separates a tool_use response from its
+    tool_result request, which Anthropic rejects on every later run. A
+    deque(maxlen=...) would be simpler but would evict the first message
+    and cut mid-turn. The kept tail may slightly exceed the cap.
+    """
+    overflow = len(messages) - MAX_HISTORY_MESSAGES
+    if overflow <= 0:
+        return
+    for cut in range(overflow + 1, len(messages)):
+        msg = messages[cut]
+        if isinstance(msg, ModelRequest) and any(
+            isinstance(part, UserPromptPart) for part in msg.parts
+        ):
+            del messages[1:cut]
+            return
+    # No user-turn boundary past the cap: leave the transcript alone
+    # rather than tear a tool_use/tool_result pair apart
+
+
+async def chat(message, history, request: gr.Request):
     """Handle chat messages with the agent."""
-    global agent, deps, message_history
+    session_id = request.session_hash
+    message_history = _session_history(session_id)
 
-    # Lazy initialization on first message
-    if agent is None:
-        # Create and configure the agent
-        agent = create_agent()
-        deps = create_deps()
-        register_tools(agent)
+    # State today's date in the session's first user message. Putting it
+    # here (not in the system prompt, which must stay byte-stable for
+    # prompt caching) saves the model a get_current_date tool round-trip.
+    if not message_history:
+        message = f"Today is {date.today().isoformat()}.\n\n{message}"
 
     try:
-        # Run agent with message history and dependencies
-        result = await agent.run(message, message_history=message_history, deps=deps)
-
-        # Update message history with the full conversation
-        message_history = result.all_messages()
-
-        return result.output
-
+        # Stream the run so the user sees tokens as they arrive instead of
+        # waiting for the full generation; Gradio re-renders the partial
+        # text yielded on every iteration. The turn is capped against one
+        # deadline so a runaway tool loop can't hold a queue slot for
+        # minutes — but never by a timeout scope held across a yield:
+        # a cancellation firing while the generator is suspended there
+        # lands in the consumer and would bypass the except branch below.
+        # So the agent phase (model request + tool loop) gets its own
+        # scope, and each streamed chunk is bounded with wait_for.
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.agent_timeout_s
+
+        async with contextlib.AsyncExitStack() as stack:
+            async with asyncio.timeout_at(deadline):
+                result = await stack.enter_async_context(agent.run_stream(
+                    message, message_history=message_history, deps=deps
+                ))
+
+            stream = aiter(result.stream_text())
+            while True:
+                try:
+                    text = await asyncio.wait_for(
+                        anext(stream), deadline - loop.time()
+                    )
+                except StopAsyncIteration:
+                    break
+                yield text
+
+            # Append only this turn's new messages and trim in place:
+            # the session keeps one bounded list instead of re-copying
+            # the whole transcript out of all_messages() every turn
+            message_history.extend(result.new_messages())
+            _trim_history(message_history)
+
+    except TimeoutError:
+        yield f"Error: the agent did not finish within {settings.agent_timeout_s:.0f}s. Please try again."
     except Exception as e:
-        return f"Error: {str(e)}"
+        yield f"Error: {str(e)}"
 
 
 async def fetch_and_open_widget():
@@ -71,37 +157,60 @@ AIRBYTE_HEAD = """
 </script>
 """
 
-# Create Gradio interface with custom layout
-with gr.Blocks(title="AI Agent Chat", head=AIRBYTE_HEAD) as demo:
-    # Header row with title and button
-    with gr.Row():
-        gr.Markdown("# AI Agent Chat")
-        open_widget_btn = gr.Button("Add Connector", size="sm", scale=0)
-
-    # Chat interface with existing functionality
-    gr.ChatInterface(
-        chat,
-        description="Ask me about anything you are looking to learn more about.",
-        examples=[
-            "List 10 users in my Gong organization",
-            "Show me a call transcript from last week",
-            "List all contacts in HubSpot",
-            "Find companies with domain invesco.com"
-        ]
-    )
-
-    # Hidden HTML component for widget rendering
-    widget_html = gr.HTML()
-
-    # Wire button click to widget opening
-    open_widget_btn.click(
-        fn=fetch_and_open_widget,
-        inputs=[],
-        outputs=[widget_html],
-        api_name=False
-    )
 
-if __name__ == "__main__":
+def main():
+    """Build the Gradio UI and launch the server."""
+    # Deferred import: gradio's import chain (fastapi, pandas, PIL, ...)
+    # dominates cold start, and only the entrypoint needs the UI
+    global gr
+    import gradio as gr
+
+    # Create Gradio interface with custom layout
+    with gr.Blocks(title="AI Agent Chat", head=AIRBYTE_HEAD) as demo:
+        # Header row with title and button
+        with gr.Row():
+            gr.Markdown("# AI Agent Chat")
+            open_widget_btn = gr.Button("Add Connector", size="sm", scale=0)
+
+        # Chat interface with existing functionality
+        gr.ChatInterface(
+            chat,
+            description="Ask me about anything you are looking to learn more about.",
+            examples=[
+                "List 10 users in my Gong organization",
+                "Show me a call transcript from last week",
+                "List all contacts in HubSpot",
+                "Find companies with domain invesco.com"
+            ]
+        )
+
+        # Hidden HTML component for widget rendering
+        widget_html = gr.HTML()
+
+        # Wire button click to widget opening
+        open_widget_btn.click(
+            fn=fetch_and_open_widget,
+            inputs=[],
+            outputs=[widget_html],
+            api_name=False
+        )
+
     print("Starting AI Agent Chat...")
     print("Server running on http://localhost:8000")
+
+    # Explicit queue limits: gradio's default concurrency of 1 would make
+    # every long LLM turn block all other sessions
+    demo.queue(max_size=64, default_concurrency_limit=16)
     demo.launch(server_port=8000, server_name="0.0.0.0")
+
+
+if __name__ == "__main__":
+    # uvloop speeds up socket and task scheduling for every await on the
+    # request path; fall back silently where it's unavailable (Windows)
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
+    main()
@@ -0,0 +1,39 @@
+"""Centralized application settings.
+
+Loaded once at import and shared by every module, replacing the scattered
+load_dotenv() / os.getenv() calls: the .env file is read a single time per
+process and misconfigured values surface as typed validation errors at
+startup rather than at the first tool call.
+"""
+
+from pathlib import Path
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+# Shared .env at the project root (the same file setup.sh/run.sh expect)
+_ENV_FILE = Path(__file__).resolve().parents[2] / ".env"
+
+
+class Settings(BaseSettings):
+    """Environment-backed configuration (AC_-prefixed variables)."""
+
+    model_config = SettingsConfigDict(
+        env_file=_ENV_FILE,
+        env_prefix="AC_",
+        extra="ignore",
+        frozen=True,
+    )
+
+    airbyte_client_id: str | None = None
+    airbyte_client_secret: str | None = None
+    # No default here: the widget flow must fail loudly when this is
+    # unset; the connector setup applies its own fallback at the use site
+    external_user_id: str | None = None
+    anthropic_api_key: str | None = None
+
+    # Hard cap (seconds) on a single agent turn; bounds tail latency when
+    # a tool-call loop runs away (see chat.py)
+    agent_timeout_s: float = 120.0
+
+
+settings = Settings()